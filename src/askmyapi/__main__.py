@@ -4,19 +4,17 @@ import logging
 
 from askmyapi.config import load_environment, get_llm
 from askmyapi.spec_loader import load_and_deref_spec
-from askmyapi.ingestion import openapi_to_documents
-from askmyapi.vectorstore import setup_vectorstore
-from askmyapi.rag import create_rag_chain
-from askmyapi.interface import launch_chat_interface
 
 logger = logging.getLogger(__name__)
 
+_SLUG_WS = re.compile(r"\s+")
+_SLUG_STRIP = re.compile(r"[^a-z0-9_]+")
+
 
 def _slugify(title: str) -> str:
     """Create a filesystem- and collection-friendly slug from an API title."""
-    slug = re.sub(r"\s+", "_", title.strip().lower())
-    slug = re.sub(r"[^a-z0-9_]+", "", slug)
-    return slug or "api"
+    slug = _SLUG_WS.sub("_", title.strip().lower())
+    return _SLUG_STRIP.sub("", slug) or "api"
 
 
 def main() -> None:
@@ -36,6 +34,17 @@ def main() -> None:
     )
     args = parser.parse_args()
 
+    # Heavy dependencies (LangChain, Chroma, Torch, Gradio) are imported only
+    # once argument parsing succeeded, so `--help` and usage errors stay fast.
+    from askmyapi.ingestion import openapi_to_documents
+    from askmyapi.vectorstore import (
+        is_index_complete,
+        mark_index_complete,
+        setup_vectorstore,
+    )
+    from askmyapi.rag import create_rag_chain
+    from askmyapi.interface import launch_chat_interface
+
     load_environment()
 
     if args.debug:
@@ -53,17 +62,22 @@ def main() -> None:
     api_name = _slugify(spec.get("info", {}).get("title", "api"))
     logger.info("Spec loaded. API name: %s, hash: %s", api_name, spec_hash)
 
-    # Build documents and vector store
-    logger.info("Converting spec to documents...")
-    documents = openapi_to_documents(
-        spec, api_name=api_name, spec_hash=spec_hash
-    )
-    logger.info("Generated %d documents", len(documents))
+    # Build documents and vector store; documents are streamed into the index.
+    indexed = is_index_complete(api_name=api_name, spec_hash=spec_hash)
+    if indexed:
+        logger.info("Index already complete for this spec, skipping ingestion")
+        documents = []
+    else:
+        documents = openapi_to_documents(
+            spec, api_name=api_name, spec_hash=spec_hash
+        )
 
     logger.info("Setting up vectorstore...")
     retriever, docstore = setup_vectorstore(
         documents, llm, api_name=api_name, spec_hash=spec_hash
     )
+    if not indexed:
+        mark_index_complete(api_name=api_name, spec_hash=spec_hash)
     logger.info("Vectorstore ready")
 
     # Create the RAG chain and memory
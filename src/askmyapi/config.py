@@ -1,8 +1,6 @@
 import os
 import logging
 from dotenv import load_dotenv
-from langchain_ollama import OllamaLLM
-from langchain_openai import ChatOpenAI
 
 
 def load_environment() -> None:
@@ -23,9 +21,13 @@ def get_llm():
     ollama_model = os.getenv("OLLAMA_MODEL", "llama3")
 
     if openai_key:
+        from langchain_openai import ChatOpenAI
+
         return ChatOpenAI(
             model=openai_model, temperature=0, api_key=openai_key
         )
 
+    from langchain_ollama import OllamaLLM
+
     logging.warning("OpenAI API key not found. Using Ollama as fallback.")
     return OllamaLLM(model=ollama_model)
@@ -1,5 +1,6 @@
-import json
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterator
+
+import orjson
 from langchain.schema import Document
 
 _HTTP_METHODS = {
@@ -13,29 +14,80 @@ _HTTP_METHODS = {
     "trace",
 }
 
+# Page-content layouts, filled once per document with str.format_map.
+_OPERATION_TMPL = (
+    "OPERATION: {method} {path}\n"
+    "OPERATION_ID: {op_id}\n"
+    "TAGS: {tags}\n"
+    "SUMMARY: {summary}\n"
+    "DESCRIPTION:\n"
+    "{description}\n"
+    "BASE_URLS: {base_urls}"
+)
+_PARAMETER_TMPL = (
+    "PARAMETER\n"
+    "for: {method} {path}\n"
+    "name: {name}\n"
+    "in: {loc}\n"
+    "required: {required}\n"
+    "description: {description}\n"
+    "schema: {schema}"
+)
+_REQUEST_BODY_TMPL = (
+    "REQUEST BODY\n"
+    "for: {method} {path}\n"
+    "required: {required}\n"
+    "content: {content}"
+)
+_RESPONSE_TMPL = (
+    "RESPONSE\n"
+    "for: {method} {path}\n"
+    "status: {status}\n"
+    "description: {description}\n"
+    "content: {content}"
+)
+_SCHEMA_TMPL = (
+    "SCHEMA\n"
+    "name: {name}\n"
+    "title: {title}\n"
+    "description:\n"
+    "{description}\n"
+    "schema_json:\n"
+    "{schema}"
+)
+
+
+def _json(value: Any) -> str:
+    """Compact JSON for embedding: no indentation keeps token counts down."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
 
 def _doc(content: str, **meta) -> Document:
     """Helper to build a Document with metadata stripped of empty values."""
-    metadata = {k: v for k, v in meta.items() if v not in (None, "", [], {})}
+    # Truthiness drops None/""/[]/{}; numbers and booleans such as
+    # required=False are meaningful and kept.
+    metadata = {
+        k: v for k, v in meta.items() if v or isinstance(v, (bool, int, float))
+    }
     return Document(page_content=content, metadata=metadata)
 
 
 def openapi_to_documents(
     spec: Dict[str, Any], api_name: str, spec_hash: str
-) -> List[Document]:
+) -> Iterator[Document]:
     """
-    Transform a dereferenced OpenAPI specification into a list of Documents.
+    Transform a dereferenced OpenAPI specification into a stream of Documents.
     We create:
       - One parent "operation" document per (method, path)
       - Child documents for parameters, request bodies, responses
       - Schema documents for top-level components.schemas
+    Documents are yielded one at a time so large specs are never held in full.
     """
-    docs: List[Document] = []
-
     servers = spec.get("servers", [])
     base_urls = [
         s.get("url") for s in servers if isinstance(s, dict) and s.get("url")
     ]
+    base_urls_str = ", ".join(base_urls) or "N/A"
 
     paths = spec.get("paths", {}) or {}
     for path, item in paths.items():
@@ -44,6 +96,7 @@ def openapi_to_documents(
         for method, op in item.items():
             if method.lower() not in _HTTP_METHODS or not isinstance(op, dict):
                 continue
+            method_upper = method.upper()
 
             op_id = op.get("operationId") or f"{method}_{path}".replace(
                 "/", "_"
@@ -53,26 +106,26 @@ def openapi_to_documents(
             description = op.get("description", "")
 
             # ---- Parent: operation
-            parent_txt = [
-                f"OPERATION: {method.upper()} {path}",
-                f"OPERATION_ID: {op_id}",
-                f"TAGS: {', '.join(tags) if tags else 'N/A'}",
-                f"SUMMARY: {summary or 'N/A'}",
-                "DESCRIPTION:",
-                description or "N/A",
-                f"BASE_URLS: {', '.join(base_urls) or 'N/A'}",
-            ]
-            docs.append(
-                _doc(
-                    "\n".join(parent_txt),
-                    kind="operation",
-                    api_name=api_name,
-                    spec_hash=spec_hash,
-                    method=method.upper(),
-                    path=path,
-                    operationId=op_id,
-                    tags=tags,
-                )
+            parent_txt = _OPERATION_TMPL.format_map(
+                {
+                    "method": method_upper,
+                    "path": path,
+                    "op_id": op_id,
+                    "tags": ", ".join(tags) if tags else "N/A",
+                    "summary": summary or "N/A",
+                    "description": description or "N/A",
+                    "base_urls": base_urls_str,
+                }
+            )
+            yield _doc(
+                parent_txt,
+                kind="operation",
+                api_name=api_name,
+                spec_hash=spec_hash,
+                method=method_upper,
+                path=path,
+                operationId=op_id,
+                tags=tags,
             )
 
             # ---- Children: parameters
@@ -82,44 +135,48 @@ def openapi_to_documents(
                 required = p.get("required", False)
                 desc = p.get("description", "")
                 schema = p.get("schema", {})
-                docs.append(
-                    _doc(
-                        "PARAMETER\n"
-                        f"for: {method.upper()} {path}\n"
-                        f"name: {name}\n"
-                        f"in: {loc}\n"
-                        f"required: {required}\n"
-                        f"description: {desc}\n"
-                        f"schema: {json.dumps(schema, ensure_ascii=False, indent=2)}",
-                        kind="parameter",
-                        api_name=api_name,
-                        spec_hash=spec_hash,
-                        method=method.upper(),
-                        path=path,
-                        operationId=op_id,
-                        param_in=loc,
-                        param_name=name,
-                        required=required,
-                    )
+                yield _doc(
+                    _PARAMETER_TMPL.format_map(
+                        {
+                            "method": method_upper,
+                            "path": path,
+                            "name": name,
+                            "loc": loc,
+                            "required": required,
+                            "description": desc,
+                            "schema": _json(schema),
+                        }
+                    ),
+                    kind="parameter",
+                    api_name=api_name,
+                    spec_hash=spec_hash,
+                    method=method_upper,
+                    path=path,
+                    operationId=op_id,
+                    param_in=loc,
+                    param_name=name,
+                    required=required,
                 )
 
             # ---- Child: requestBody
             if "requestBody" in op:
                 rb = op["requestBody"] or {}
                 content = rb.get("content", {})
-                docs.append(
-                    _doc(
-                        "REQUEST BODY\n"
-                        f"for: {method.upper()} {path}\n"
-                        f"required: {rb.get('required', False)}\n"
-                        f"content: {json.dumps(content, ensure_ascii=False, indent=2)}",
-                        kind="requestBody",
-                        api_name=api_name,
-                        spec_hash=spec_hash,
-                        method=method.upper(),
-                        path=path,
-                        operationId=op_id,
-                    )
+                yield _doc(
+                    _REQUEST_BODY_TMPL.format_map(
+                        {
+                            "method": method_upper,
+                            "path": path,
+                            "required": rb.get("required", False),
+                            "content": _json(content),
+                        }
+                    ),
+                    kind="requestBody",
+                    api_name=api_name,
+                    spec_hash=spec_hash,
+                    method=method_upper,
+                    path=path,
+                    operationId=op_id,
                 )
 
             # ---- Children: responses per status
@@ -128,21 +185,23 @@ def openapi_to_documents(
                     continue
                 desc = resp.get("description", "")
                 content = resp.get("content", {})
-                docs.append(
-                    _doc(
-                        "RESPONSE\n"
-                        f"for: {method.upper()} {path}\n"
-                        f"status: {status}\n"
-                        f"description: {desc}\n"
-                        f"content: {json.dumps(content, ensure_ascii=False, indent=2)}",
-                        kind="response",
-                        api_name=api_name,
-                        spec_hash=spec_hash,
-                        method=method.upper(),
-                        path=path,
-                        operationId=op_id,
-                        status_code=status,
-                    )
+                yield _doc(
+                    _RESPONSE_TMPL.format_map(
+                        {
+                            "method": method_upper,
+                            "path": path,
+                            "status": status,
+                            "description": desc,
+                            "content": _json(content),
+                        }
+                    ),
+                    kind="response",
+                    api_name=api_name,
+                    spec_hash=spec_hash,
+                    method=method_upper,
+                    path=path,
+                    operationId=op_id,
+                    status_code=status,
                 )
 
     # ---- Components: schemas
@@ -150,18 +209,17 @@ def openapi_to_documents(
     for name, schema in schemas.items():
         title = schema.get("title", name)
         desc = schema.get("description", "")
-        docs.append(
-            _doc(
-                "SCHEMA\n"
-                f"name: {name}\n"
-                f"title: {title}\n"
-                f"description:\n{desc}\n"
-                f"schema_json:\n{json.dumps(schema, ensure_ascii=False, indent=2)}",
-                kind="schema",
-                api_name=api_name,
-                spec_hash=spec_hash,
-                schema_name=name,
-            )
+        yield _doc(
+            _SCHEMA_TMPL.format_map(
+                {
+                    "name": name,
+                    "title": title,
+                    "description": desc,
+                    "schema": _json(schema),
+                }
+            ),
+            kind="schema",
+            api_name=api_name,
+            spec_hash=spec_hash,
+            schema_name=name,
         )
-
-    return docs
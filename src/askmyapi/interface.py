@@ -3,7 +3,6 @@ import uuid
 import logging
 from typing import Optional, List
 
-import gradio as gr
 from langchain.schema import Document
 from langchain.retrievers.multi_vector import MultiVectorRetriever
 
@@ -40,23 +39,29 @@ def launch_chat_interface(
             return text[:max_learn_chars]
         return text
 
-    def add_text_to_vectorstore(text: str, source: str = "user") -> str:
-        text = _truncate_if_needed(text)
-        if not text.strip():
-            return "No content to index."
-
-        doc = Document(
-            page_content=text, metadata={"source": source, "kind": "note"}
+    def _note(text: str, source: str) -> Document:
+        return Document(
+            page_content=_truncate_if_needed(text),
+            metadata={"source": source, "kind": "note"},
         )
+
+    def add_documents_to_vectorstore(docs: List[Document]) -> str:
+        """Index all notes with a single setup_vectorstore call."""
+        docs = [doc for doc in docs if doc.page_content.strip()]
+        if not docs:
+            return "No content to index."
         try:
             setup_vectorstore(
-                [doc], llm, api_name=api_name, spec_hash=spec_hash
+                docs, llm, api_name=api_name, spec_hash=spec_hash
             )
             return "Content indexed successfully."
         except Exception as e:
             logger.exception("Indexing failed")
             return f"Indexing failed: {e}"
 
+    def add_text_to_vectorstore(text: str, source: str = "user") -> str:
+        return add_documents_to_vectorstore([_note(text, source)])
+
     def handle_chat_input(
         user_input: str, history: Optional[List] = None
     ) -> str:
@@ -65,11 +70,11 @@ def launch_chat_interface(
         try:
             logger.info("User input: %s", user_input)
 
-            memory.chat_memory.add_user_message(user_input)
+            chat_history = memory.load_memory_variables({})["chat_history"]
             response = rag_chain.invoke(
                 {
                     "input": user_input,
-                    "chat_history": memory.chat_memory.messages,
+                    "chat_history": chat_history,
                 }
             )
 
@@ -87,13 +92,23 @@ def launch_chat_interface(
                 answer = str(response) if response is not None else ""
 
             logger.info("Final answer: %s", answer)
-
-            memory.chat_memory.add_ai_message(answer or "")
-            return answer or "No answer produced."
         except Exception:
             logger.exception("Error in handle_chat_input")
             return "Unexpected error during chat handling."
 
+        # save_context trims the history to the memory's token budget; token
+        # counting may need a tokenizer download, so a failure here must not
+        # discard the answer.
+        try:
+            memory.save_context(
+                {"input": user_input}, {"output": answer or ""}
+            )
+        except Exception:
+            logger.exception("Failed to record chat turn in memory")
+        return answer or "No answer produced."
+
+    import gradio as gr
+
     # --- Gradio UI
     with gr.Blocks(title="AskMyAPI - OpenAPI Chatbot") as app:
         gr.Markdown("# AskMyAPI")
@@ -131,7 +146,7 @@ def launch_chat_interface(
         def _on_index_files(files):
             if not files:
                 return "No files selected."
-            added = 0
+            docs: List[Document] = []
             for f in files:
                 try:
                     with open(f.name, "r", encoding="utf-8") as fp:
@@ -139,11 +154,11 @@ def launch_chat_interface(
                 except Exception as e:
                     logger.exception("Failed to read uploaded file %s", f.name)
                     return f"Failed to read '{os.path.basename(f.name)}': {e}"
-                res = add_text_to_vectorstore(
-                    content, source=os.path.basename(f.name)
-                )
-                if "successfully" in res:
-                    added += 1
+                docs.append(_note(content, os.path.basename(f.name)))
+            res = add_documents_to_vectorstore(docs)
+            if "successfully" not in res:
+                return res
+            added = sum(1 for doc in docs if doc.page_content.strip())
             return f"Indexed {added} file(s)."
 
         def _on_index_text(text):
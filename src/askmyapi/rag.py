@@ -1,12 +1,88 @@
+import functools
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
 from langchain.chains.history_aware_retriever import (
     create_history_aware_retriever,
 )
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationTokenBufferMemory
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import LLMChainExtractor
+from langchain.schema import Document
+from langchain_core.callbacks import Callbacks
+
+from askmyapi.vectorstore import CACHE_DIR
+
+COMPRESS_CACHE_DIR = os.path.join(CACHE_DIR, "compress")
+HISTORY_TOKEN_LIMIT = 1500  # Older turns are dropped beyond this budget
+
+
+@functools.lru_cache(maxsize=1)
+def _get_compress_cache():
+    import diskcache
+
+    return diskcache.Cache(COMPRESS_CACHE_DIR)
+
+
+class CachedLLMChainExtractor(LLMChainExtractor):
+    """
+    LLMChainExtractor that remembers its output per (query, document) pair.
+
+    Cache misses are extracted concurrently, one LLM call per document.
+    Documents the LLM judged irrelevant are cached as None and dropped.
+    Keys include the LLM identity, so backends never share extractions.
+    """
+
+    cache_namespace: str = ""
+
+    @classmethod
+    def from_llm(cls, llm, **kwargs) -> "CachedLLMChainExtractor":
+        extractor = super().from_llm(llm, **kwargs)
+        model = getattr(llm, "model", None) or getattr(llm, "model_name", "")
+        extractor.cache_namespace = f"{llm.__class__.__name__}:{model}"
+        return extractor
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        cache = _get_compress_cache()
+        keys = [
+            hashlib.sha1(
+                "\x00".join(
+                    (self.cache_namespace, query, doc.page_content)
+                ).encode("utf-8")
+            ).hexdigest()
+            for doc in documents
+        ]
+        extracted = [cache.get(key, default=False) for key in keys]
+        misses = [i for i, text in enumerate(extracted) if text is False]
+
+        if misses:
+            compress = super().compress_documents
+            with ThreadPoolExecutor(max_workers=len(misses)) as pool:
+                results = pool.map(
+                    lambda i: compress([documents[i]], query, callbacks),
+                    misses,
+                )
+                for i, compressed in zip(misses, results):
+                    extracted[i] = (
+                        compressed[0].page_content if compressed else None
+                    )
+                    cache[keys[i]] = extracted[i]
+
+        return [
+            Document(page_content=text, metadata=doc.metadata)
+            for doc, text in zip(documents, extracted)
+            if text is not None
+        ]
 
 
 def create_rag_chain(llm, retriever):
@@ -21,13 +97,16 @@ def create_rag_chain(llm, retriever):
       ContextualCompressionRetriever, causing a type mismatch error.
     """
 
-    # Chat memory (keeps track of conversation history)
-    memory = ConversationBufferMemory(
-        return_messages=True, memory_key="chat_history"
+    # Chat memory (keeps a token-bounded window of conversation history)
+    memory = ConversationTokenBufferMemory(
+        llm=llm,
+        max_token_limit=HISTORY_TOKEN_LIMIT,
+        return_messages=True,
+        memory_key="chat_history",
     )
 
     # --- Step 1: Add a compression layer on the base retriever
-    compressor = LLMChainExtractor.from_llm(llm)
+    compressor = CachedLLMChainExtractor.from_llm(llm)
     compressed_base = ContextualCompressionRetriever(
         base_compressor=compressor, base_retriever=retriever
     )
@@ -1,12 +1,9 @@
 import hashlib
 import json
 import logging
+import os
 from typing import Any, Dict, Tuple
 
-import yaml
-from prance import ResolvingParser
-from openapi_spec_validator import validate_spec
-
 logger = logging.getLogger(__name__)
 
 
@@ -14,6 +11,8 @@ def _read_raw(path: str) -> Dict[str, Any]:
     """Read a JSON or YAML file into a Python dictionary without resolving $refs."""
     logger.debug("Reading raw spec file: %s", path)
     if path.endswith((".yaml", ".yml")):
+        import yaml
+
         with open(path, "r", encoding="utf-8") as f:
             data = yaml.safe_load(f)
     else:
@@ -26,6 +25,15 @@ def _read_raw(path: str) -> Dict[str, Any]:
     return data
 
 
+def _hash_file(path: str) -> str:
+    """Stream the raw file bytes through SHA-256 and return a 12-char hex digest."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
 def load_and_deref_spec(
     path: str, *, validate: bool = True
 ) -> Tuple[Dict[str, Any], str]:
@@ -36,23 +44,29 @@ def load_and_deref_spec(
         (spec, spec_hash): the dereferenced spec dict and a short stable hash (12 hex chars)
                            used to scope caches and vectorstore collections.
     """
+    from prance.util.resolver import RefResolver
+
     logger.info("Loading and dereferencing spec: %s", path)
 
     # Compute a stable hash of the raw file for cache scoping.
-    raw = _read_raw(path)
-    spec_str = json.dumps(raw, sort_keys=True, ensure_ascii=False)
-    spec_hash = hashlib.sha256(spec_str.encode("utf-8")).hexdigest()[:12]
+    spec_hash = _hash_file(path)
     logger.debug("Computed spec hash: %s", spec_hash)
 
-    # ResolvingParser re-reads the file and expands $refs.
-    parser = ResolvingParser(path, resolve=True)
-    deref = parser.specification  # resolved dictionary
+    raw = _read_raw(path)
+
+    # Expand $refs on the already-parsed dict rather than letting prance
+    # re-read the file; the file URL is kept as base for relative refs.
+    resolver = RefResolver(raw, os.path.abspath(path))
+    resolver.resolve_references()
+    deref = resolver.specs  # resolved dictionary
     logger.info(
         "Spec successfully dereferenced, top-level keys: %s",
         list(deref.keys()),
     )
 
     if validate:
+        from openapi_spec_validator import validate_spec
+
         logger.info("Validating spec...")
         try:
             validate_spec(deref)
@@ -1,23 +1,58 @@
 import os
+import functools
 import hashlib
-import json
+import itertools
 import logging
-from typing import Dict, Set, Tuple, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Set,
+    Tuple,
+    List,
+)
 
-from langchain_chroma import Chroma
-from langchain.storage import InMemoryByteStore
+import numpy as np
+import orjson
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.stores import BaseStore
+from langchain.storage import LocalFileStore, create_kv_docstore
 from langchain.retrievers.multi_vector import MultiVectorRetriever
-from langchain_huggingface import HuggingFaceEmbeddings
 from tenacity import retry, wait_exponential, stop_after_attempt
 from tqdm import tqdm
 
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
 logger = logging.getLogger(__name__)
 
 EMBEDDING_MODEL = "intfloat/multilingual-e5-base"  # Fixed choice: robust multilingual retrieval
+EMBEDDING_BATCH_SIZE = 32  # Texts per SentenceTransformer forward pass
+EMBEDDING_BATCH_SIZE_GPU = 128  # Same, when running on CUDA
+INDEX_BATCH_SIZE = 128  # Documents enriched and embedded per add_texts call
+LLM_MAX_WORKERS = 8  # Concurrent LLM calls when generating derived texts
+
+# LLM-derived children per document kind. Parameters, request bodies and
+# responses are short and structured already, so their own text is embedded
+# once instead (SELF_CHILD). Kinds not listed (e.g. notes) get every child.
+SELF_CHILD = "self"
+DERIVED_KINDS = ("summary", "hyde", "example")
+ENRICHMENT_BY_KIND: Dict[str, Tuple[str, ...]] = {
+    "operation": DERIVED_KINDS,
+    "schema": ("summary", "hyde"),
+    "parameter": (),
+    "requestBody": (),
+    "response": (),
+}
 
 # Directories for persistence
 CHROMA_DIR = "chroma_store"
 CACHE_DIR = "cache"
+EMBEDDING_CACHE_DIR = os.path.join(CACHE_DIR, "embeddings")
 os.makedirs(CHROMA_DIR, exist_ok=True)
 os.makedirs(CACHE_DIR, exist_ok=True)
 
@@ -27,15 +62,173 @@ def _safe_content(msg_or_str) -> str:
     return getattr(msg_or_str, "content", msg_or_str)
 
 
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that persists document vectors on disk.
+
+    Vectors are keyed by sha1(model name + text) and stored as FP16 bytes, so
+    re-indexing unchanged texts skips the model entirely. Queries are never
+    cached.
+    """
+
+    def __init__(self, inner: Embeddings, *, namespace: str, directory: str):
+        import diskcache
+
+        self.inner = inner
+        self.namespace = namespace
+        self.cache = diskcache.Cache(directory)
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha1(
+            f"{self.namespace}\x00{text}".encode("utf-8")
+        ).digest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        blobs = [self.cache.get(k) for k in keys]
+        misses = [i for i, blob in enumerate(blobs) if blob is None]
+        logger.debug(
+            "Embedding cache: %d hits, %d misses",
+            len(texts) - len(misses),
+            len(misses),
+        )
+        if misses:
+            vectors = self.inner.embed_documents([texts[i] for i in misses])
+            for i, vec in zip(misses, vectors):
+                blobs[i] = np.asarray(vec, dtype=np.float16).tobytes()
+                self.cache[keys[i]] = blobs[i]
+        # Misses are returned through the same FP16 round-trip as hits, so
+        # the stored vectors do not depend on the cache state.
+        return [
+            np.frombuffer(blob, dtype=np.float16).astype(np.float32).tolist()
+            for blob in blobs
+        ]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.inner.embed_query(text)
+
+
+def _select_device() -> str:
+    """Pick the embedding device: EMBED_DEVICE, else CUDA, MPS or CPU."""
+    device = os.getenv("EMBED_DEVICE")
+    if device:
+        return device
+
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+@functools.lru_cache(maxsize=2)
+def _get_embedding(model_name: str) -> Embeddings:
+    """Load the sentence-transformer once per process and reuse it."""
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    device = _select_device()
+    on_cuda = device.startswith("cuda")
+    model_kwargs: Dict[str, Any] = {"device": device}
+    if on_cuda:
+        # Half precision uses tensor cores; only worth it on CUDA.
+        model_kwargs["model_kwargs"] = {"torch_dtype": torch.float16}
+    logger.info("Loading embedding model: %s on %s", model_name, device)
+    model = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={
+            "batch_size": (
+                EMBEDDING_BATCH_SIZE_GPU if on_cuda else EMBEDDING_BATCH_SIZE
+            ),
+            "normalize_embeddings": True,
+        },
+    )
+    return CachedEmbeddings(
+        model, namespace=model_name, directory=EMBEDDING_CACHE_DIR
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _get_vectorstore(collection: str, model_name: str) -> "Chroma":
+    """Open a persisted Chroma collection once per process and reuse it."""
+    from langchain_chroma import Chroma
+
+    return Chroma(
+        persist_directory=CHROMA_DIR,
+        collection_name=collection,
+        embedding_function=_get_embedding(model_name),
+    )
+
+
+def _child_kinds(doc: Document) -> Tuple[str, ...]:
+    """Return the child vectors to index for a document, by its kind."""
+    kinds = ENRICHMENT_BY_KIND.get(doc.metadata.get("kind"), DERIVED_KINDS)
+    return kinds or (SELF_CHILD,)
+
+
+def _collection_name(api_name: str, spec_hash: str) -> str:
+    return f"openapi_vectors_{api_name}_{spec_hash}"
+
+
+def _sentinel_path(collection: str) -> str:
+    return os.path.join(CACHE_DIR, f"{collection}.done")
+
+
+def is_index_complete(*, api_name: str, spec_hash: str) -> bool:
+    """
+    Return True if a previous run finished indexing this spec.
+
+    The sentinel written by `mark_index_complete` records the collection size;
+    the index counts as complete while the collection still holds that many.
+    """
+    collection = _collection_name(api_name, spec_hash)
+    path = _sentinel_path(collection)
+    if not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read().strip()
+    try:
+        expected = int(content)
+    except ValueError:
+        logger.warning("Ignoring unreadable index sentinel %s", path)
+        return False
+    vectorstore = _get_vectorstore(collection, EMBEDDING_MODEL)
+    count = vectorstore._collection.count()  # pylint: disable=protected-access
+    logger.debug("Sentinel expects %d rows, found %d", expected, count)
+    return count >= expected
+
+
+def mark_index_complete(*, api_name: str, spec_hash: str) -> None:
+    """Record that the spec is fully indexed so later runs skip ingestion."""
+    collection = _collection_name(api_name, spec_hash)
+    vectorstore = _get_vectorstore(collection, EMBEDDING_MODEL)
+    count = vectorstore._collection.count()  # pylint: disable=protected-access
+    with open(_sentinel_path(collection), "w", encoding="utf-8") as f:
+        f.write(str(count))
+    logger.debug("Marked %s complete with %d rows", collection, count)
+
+
+def _get_docstore(path: str) -> BaseStore[str, Document]:
+    """Open an on-disk Document store; keys are hashed into safe file names."""
+    return create_kv_docstore(
+        LocalFileStore(path),
+        key_encoder=lambda key: hashlib.sha1(key.encode("utf-8")).hexdigest(),
+    )
+
+
 def setup_vectorstore(
-    documents: List,
+    documents: Iterable[Document],
     llm,
     *,
     api_name: str,
     spec_hash: str,
-) -> Tuple[MultiVectorRetriever, InMemoryByteStore]:
+) -> Tuple[MultiVectorRetriever, BaseStore[str, Document]]:
     """
-    Build or resume the Chroma multivector index from a list of parent/child Documents.
+    Build or resume the Chroma multivector index from parent/child Documents.
+    - Documents are consumed in batches, so generators are streamed.
     - Deterministic IDs per document to keep re-indexing stable.
     - Spec-scoped caches (summaries, questions, examples) to avoid mixing APIs.
     """
@@ -43,10 +236,10 @@ def setup_vectorstore(
         "Setting up vectorstore for API=%s, hash=%s", api_name, spec_hash
     )
 
-    docstore = InMemoryByteStore()
-    embedding = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    COLLECTION = _collection_name(api_name, spec_hash)
 
-    COLLECTION = f"openapi_vectors_{api_name}_{spec_hash}"
+    # Parent docs persist next to the caches so restarts need no re-ingest.
+    docstore = _get_docstore(os.path.join(CACHE_DIR, f"{COLLECTION}_docstore"))
 
     SUMMARY_CACHE_PATH = os.path.join(
         CACHE_DIR, f"{COLLECTION}_summaries.json"
@@ -62,14 +255,7 @@ def setup_vectorstore(
     questions: Dict[str, str] = _load_json(QUESTIONS_CACHE_PATH)
     examples: Dict[str, str] = _load_json(EXAMPLES_CACHE_PATH)
 
-    vectorstore = Chroma(
-        persist_directory=CHROMA_DIR,
-        collection_name=COLLECTION,
-        embedding_function=embedding,
-    )
-
-    existing_ids: Set[str] = _get_all_ids(vectorstore)
-    logger.debug("Vectorstore already contains %d IDs", len(existing_ids))
+    vectorstore = _get_vectorstore(COLLECTION, EMBEDDING_MODEL)
 
     @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
     def _llm(txt: str) -> str:
@@ -96,51 +282,111 @@ def setup_vectorstore(
             "If no HTTP call is relevant, return 'N/A'.\n" + text
         )
 
-    for i, doc in enumerate(tqdm(documents, desc="Indexing")):
-        op_id = doc.metadata.get("operationId")
-        stable = (
-            op_id
-            or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:12]
-        )
-        base_id = f"{doc.metadata.get('kind','doc')}::{stable}::{i}"
+    derived: Dict[str, Tuple[Dict[str, str], Callable[[str], str]]] = {
+        "summary": (summaries, generate_summary),
+        "hyde": (questions, generate_questions),
+        "example": (examples, generate_examples),
+    }
 
-        logger.debug(
-            "Indexing doc #%d with base_id=%s, kind=%s",
-            i,
-            base_id,
-            doc.metadata.get("kind"),
-        )
+    def index_batch(
+        batch: List[Tuple[int, Document]], pool: ThreadPoolExecutor
+    ) -> None:
+        """Store, enrich and embed one batch of documents."""
+        # Assign deterministic IDs and collect the children to look up.
+        parents: List[Tuple[str, Document]] = []
+        for i, doc in batch:
+            op_id = doc.metadata.get("operationId")
+            stable = op_id or hashlib.sha1(
+                doc.page_content.encode("utf-8")
+            ).hexdigest()[:12]
+            base_id = f"{doc.metadata.get('kind','doc')}::{stable}::{i}"
 
-        # Store the raw parent/child doc in the byte store.
-        docstore.mset([(base_id, doc)])
-
-        # Derived texts
-        for kind, cache, gen in [
-            ("summary", summaries, generate_summary),
-            ("hyde", questions, generate_questions),
-            ("example", examples, generate_examples),
-        ]:
-            child_id = f"{base_id}:{kind}"
-            if child_id in existing_ids:
-                logger.debug("Skipping existing child_id=%s", child_id)
-                continue
-            logger.debug("Generating %s for %s", kind, base_id)
-            text = cache.get(base_id) or gen(doc.page_content)
-            cache[base_id] = text
-            vectorstore.add_texts(
-                [text],
-                ids=[child_id],
-                metadatas=[{"doc_id": base_id, "kind": kind, **doc.metadata}],
+            logger.debug(
+                "Indexing doc #%d with base_id=%s, kind=%s",
+                i,
+                base_id,
+                doc.metadata.get("kind"),
             )
 
-    _dump_json(SUMMARY_CACHE_PATH, summaries)
-    _dump_json(QUESTIONS_CACHE_PATH, questions)
-    _dump_json(EXAMPLES_CACHE_PATH, examples)
+            parents.append((base_id, doc))
+
+        # Store the raw parent/child docs in the docstore in one write.
+        docstore.mset(parents)
+
+        candidate_ids = [
+            f"{base_id}:{kind}"
+            for base_id, doc in parents
+            for kind in _child_kinds(doc)
+        ]
+        existing_ids = _get_existing_ids(vectorstore, candidate_ids)
+        logger.debug("Vectorstore already contains %d IDs", len(existing_ids))
+
+        # Collect every missing child, and the derived texts to generate.
+        children: List[Tuple[str, str, str, Document]] = []
+        missing: List[
+            Tuple[Dict[str, str], str, Callable[[str], str], str]
+        ] = []
+        for base_id, doc in parents:
+            for kind in _child_kinds(doc):
+                child_id = f"{base_id}:{kind}"
+                if child_id in existing_ids:
+                    logger.debug("Skipping existing child_id=%s", child_id)
+                    continue
+                children.append((child_id, base_id, kind, doc))
+                if kind == SELF_CHILD:
+                    continue
+                cache, gen = derived[kind]
+                if not cache.get(base_id):
+                    missing.append((cache, base_id, gen, doc.page_content))
+
+        # LLM calls are network-bound, so run them on a bounded thread pool.
+        # Results come back in submission order and are written to the caches
+        # from this thread only.
+        if missing:
+            logger.debug("Generating %d derived texts", len(missing))
+            results = pool.map(lambda task: task[2](task[3]), missing)
+            for (cache, base_id, _, _), text in zip(missing, results):
+                cache[base_id] = text
+
+        if not children:
+            return
+
+        # Embed and write the batch's child texts in a single call.
+        vectorstore.add_texts(
+            [
+                doc.page_content
+                if kind == SELF_CHILD
+                else derived[kind][0][base_id]
+                for _, base_id, kind, doc in children
+            ],
+            ids=[child_id for child_id, _, _, _ in children],
+            metadatas=[
+                {"doc_id": base_id, "kind": kind, **doc.metadata}
+                for _, base_id, kind, doc in children
+            ],
+        )
+        logger.debug("Added %d child texts to the vectorstore", len(children))
+
+    # Pull documents lazily so a generator input is never fully materialized.
+    total_docs = 0
+    numbered = enumerate(documents)
+    with ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS) as pool, tqdm(
+        desc="Indexing", unit="doc"
+    ) as progress:
+        while batch := list(itertools.islice(numbered, INDEX_BATCH_SIZE)):
+            index_batch(batch, pool)
+            total_docs += len(batch)
+            progress.update(len(batch))
+
+    if total_docs:
+        _dump_json(SUMMARY_CACHE_PATH, summaries)
+        _dump_json(QUESTIONS_CACHE_PATH, questions)
+        _dump_json(EXAMPLES_CACHE_PATH, examples)
 
     logger.info(
         "Finished indexing. Collection=%s, total_docs=%d",
         COLLECTION,
-        len(documents),
+        total_docs,
     )
 
     retriever = MultiVectorRetriever(
@@ -151,30 +397,24 @@ def setup_vectorstore(
     return retriever, docstore
 
 
-def _get_all_ids(vectorstore: Chroma) -> Set[str]:
-    ids: Set[str] = set()
-    offset = 0
+def _get_existing_ids(vectorstore: "Chroma", ids: List[str]) -> Set[str]:
+    """Return the subset of `ids` already present in the collection."""
+    found: Set[str] = set()
     limit = 5000
-    while True:
+    for k in range(0, len(ids), limit):
         batch = (
             vectorstore._collection.get(  # pylint: disable=protected-access
-                ids=None, where=None, limit=limit, offset=offset
+                ids=ids[k : k + limit], include=[]
             )
         )
-        batch_ids = batch.get("ids", [])
-        if not batch_ids:
-            break
-        ids.update(batch_ids)
-        offset += len(batch_ids)
-        if len(batch_ids) < limit:
-            break
-    return ids
+        found.update(batch.get("ids", []))
+    return found
 
 
 def _load_json(path: str) -> Dict[str, str]:
     if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
         logger.debug("Loaded cache file %s with %d entries", path, len(data))
         return data
     logger.debug("No cache file found at %s", path)
@@ -182,6 +422,6 @@ def _load_json(path: str) -> Dict[str, str]:
 
 
 def _dump_json(path: str, data: Dict[str, str]) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
     logger.debug("Dumped %d entries to %s", len(data), path)